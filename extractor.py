@@ -3,22 +3,125 @@ from __future__ import annotations
 
 import json
 import re
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 from typing import Any, Dict, Optional, Tuple
 
-from bs4 import BeautifulSoup
+try:
+    from selectolax.lexbor import LexborHTMLParser
+except ImportError:  # selectolax optionnel: repli sur bs4
+    LexborHTMLParser = None
+
+# bs4 n'est importé que si selectolax manque: le chemin chaud (Lexbor) ne
+# paie ni l'import ni ses isinstance dans les adaptateurs.
+BeautifulSoup = None
+Tag = None
+
+
+def _load_bs4() -> None:
+    global BeautifulSoup, Tag
+    if BeautifulSoup is None:
+        from bs4 import BeautifulSoup as _BeautifulSoup
+        from bs4.element import Tag as _Tag
+
+        BeautifulSoup = _BeautifulSoup
+        Tag = _Tag
+
+# Arbre HTML: LexborHTMLParser si selectolax est dispo, sinon BeautifulSoup.
+HtmlTree = Any
+
+
+# =========================
+# Regex précompilées (chemins chauds)
+# =========================
+_FR_NUM_RE = re.compile(r"[-+]?\d+(\.\d+)?")
+
+# Normalisation numérique FR en une passe C: "," -> ".", suppression des %
+# et de tous les blancs Unicode (les pages FR mélangent espaces fines
+# U+2009/U+202F, insécables et espaces simples).
+_FR_NUM_SPACES = (
+    " \t\n\r\x0b\x0c\xa0\u1680"
+    "\u2000\u2001\u2002\u2003\u2004\u2005\u2006\u2007\u2008\u2009\u200a"
+    "\u2028\u2029\u202f\u205f\u3000"
+)
+_FR_NUM_TABLE = str.maketrans({",": ".", "%": None, **{c: None for c in _FR_NUM_SPACES}})
+_MS_STAR_FR_RE = re.compile(r"Morningstar Rating\s+(\d+(?:\.\d+)?)\s+sur\s+5", re.I)
+_MS_STAR_EN_RE = re.compile(r"rating of\s+(\d+(?:\.\d+)?)\s+out of\s+5\s+stars", re.I)
+_QT_STAR_IMG_RE = re.compile(r"qt-star-(\d)-(\d)\.png")
+# Libellés de lignes de perf Quantalys: un seul automate, le groupe nommé
+# qui a matché (m.lastgroup) indique la colonne de sortie.
+_QT_PERF_RE = re.compile(
+    r"^perf\.\s*(?:(?P<p4>4\s*semaines)|(?P<pytd>1er\s*janvier)|(?P<p1>1\s*an)|(?P<p3>3\s*ans))$",
+    re.I,
+)
+_QT_PERF_KEYS = {
+    "p4": "perf_4_semaines",
+    "pytd": "perf_depuis_1er_janvier",
+    "p1": "perf_1_an",
+    "p3": "perf_3_ans",
+}
+_QT_MARK_RE = re.compile(rb"quantalys", re.I)
+_MS_MARK_RE = re.compile(rb"morningstar", re.I)
+
+# Taille du préfixe scanné par detect_site (title/meta suffisent largement)
+_DETECT_HEAD = 16384
+
+# Libellés candidats Morningstar (déjà en minuscules), figés au chargement
+_MS_ROW_FUND = frozenset({"fonds", "fund"})
+_MS_PERF_COLS: Dict[str, Tuple[str, ...]] = {
+    "perf_4_semaines": ("4 sem.", "4 sem", "4 weeks", "4w", "1 mois", "1 month", "1m"),
+    "perf_depuis_1er_janvier": ("ytd", "year to date", "depuis le début", "depuis le début de l'année"),
+    "perf_1_an": ("1 an", "1 year", "1y"),
+    "perf_3_ans": ("3 ans", "3 years", "3 year", "3y"),
+}
+# Tous les libellés de colonnes confondus, pour le pré-filtre de tables
+_MS_ALL_PERF_COLS = tuple({c for cols in _MS_PERF_COLS.values() for c in cols})
 
 
 # =========================
 # Utils
 # =========================
-def make_soup(html: str) -> BeautifulSoup:
-    # Pas besoin de lxml
+def make_soup(html: bytes) -> HtmlTree:
+    # Lexbor (C) est 10-20x plus rapide que html.parser sur ces pages
+    if LexborHTMLParser is not None:
+        return LexborHTMLParser(html)
+    _load_bs4()
     return BeautifulSoup(html, "html.parser")
 
 
+# Petits adaptateurs pour travailler indifféremment sur les deux backends.
+# NB: hasattr ne suffit pas côté bs4 (Tag.__getattr__ avale tout), d'où
+# isinstance — Tag reste None tant que le repli bs4 n'a pas servi.
+def _css(node, sel: str) -> list:
+    if Tag is not None and isinstance(node, Tag):
+        return node.select(sel)
+    return node.css(sel)
+
+
+def _css_first(node, sel: str):
+    if Tag is not None and isinstance(node, Tag):
+        return node.select_one(sel)
+    return node.css_first(sel)
+
+
+def _text(node) -> str:
+    if Tag is not None and isinstance(node, Tag):
+        return node.get_text(" ", strip=True)
+    return node.text(separator=" ", strip=True)
+
+
+def _attr(node, name: str) -> Optional[str]:
+    if Tag is not None and isinstance(node, Tag):
+        val = node.get(name)
+        if isinstance(val, list):
+            val = " ".join(val)
+        return val
+    return node.attributes.get(name)
+
+
 def _clean_text(s: str) -> str:
-    return re.sub(r"\s+", " ", (s or "")).strip()
+    # split()/join: tokenizer C, même résultat que re.sub(r"\s+", " ") + strip
+    return " ".join((s or "").split())
 
 
 def _parse_fr_number(raw: Optional[str]) -> Optional[float]:
@@ -27,12 +130,18 @@ def _parse_fr_number(raw: Optional[str]) -> Optional[float]:
     """
     if raw is None:
         return None
-    s = _clean_text(raw).replace("\u202f", " ").replace("\xa0", " ")
-    s = s.replace("%", "").strip()
+    s = raw.translate(_FR_NUM_TABLE)
     if s in {"", "—", "-", "N/A", "n/a"}:
         return None
-    s = s.replace(" ", "").replace(",", ".")
-    m = re.search(r"[-+]?\d+(\.\d+)?", s)
+
+    # Cas courant ("3.12", "-0.34"): float() direct, sans regex
+    if s[0].isdigit() or s[0] in "+-.":
+        try:
+            return float(s)
+        except ValueError:
+            pass
+
+    m = _FR_NUM_RE.search(s)
     if not m:
         return None
     try:
@@ -41,34 +150,41 @@ def _parse_fr_number(raw: Optional[str]) -> Optional[float]:
         return None
 
 
-def read_html(path: Path) -> str:
-    return path.read_text(encoding="utf-8", errors="ignore")
+def read_html(path: Path) -> bytes:
+    # Bytes bruts: les deux parseurs gèrent l'encodage eux-mêmes, inutile
+    # de payer un decode UTF-8 complet avant le parse.
+    return path.read_bytes()
 
 
 # =========================
 # Morningstar
 # =========================
-def extract_morningstar_name(soup: BeautifulSoup) -> Optional[str]:
-    node = soup.select_one('h1 span[itemprop="name"]')
-    if node:
-        return _clean_text(node.get_text(" ", strip=True))
-    if soup.title and soup.title.string:
-        return _clean_text(_clean_text(soup.title.string).split("|")[0])
+def extract_morningstar_name(soup: HtmlTree) -> Optional[str]:
+    # Le nom vit en haut du DOM: on ne cherche que dans le sous-arbre du
+    # premier <h1> plutôt que de faire descendre le sélecteur dans tout l'arbre.
+    h1 = _css_first(soup, "h1")
+    if h1 is not None:
+        node = _css_first(h1, 'span[itemprop="name"]')
+        if node:
+            return _clean_text(_text(node))
+    title = _css_first(soup, "title")
+    if title:
+        return _clean_text(_clean_text(_text(title)).split("|")[0])
     return None
 
 
-def extract_morningstar_stars(soup: BeautifulSoup) -> Optional[float]:
+def extract_morningstar_stars(soup: HtmlTree) -> Optional[float]:
     # FR: "Morningstar Rating 3 sur 5 étoiles"
-    for el in soup.find_all(attrs={"aria-label": True}):
-        aria = el.get("aria-label") or ""
-        m = re.search(r"Morningstar Rating\s+(\d+(?:\.\d+)?)\s+sur\s+5", aria, flags=re.I)
+    for el in _css(soup, "[aria-label]"):
+        aria = _attr(el, "aria-label") or ""
+        m = _MS_STAR_FR_RE.search(aria)
         if m:
             return float(m.group(1))
 
     # EN fallback: "rating of 4 out of 5 stars"
-    for el in soup.find_all(attrs={"aria-label": True}):
-        aria = el.get("aria-label") or ""
-        m = re.search(r"rating of\s+(\d+(?:\.\d+)?)\s+out of\s+5\s+stars", aria, flags=re.I)
+    for el in _css(soup, "[aria-label]"):
+        aria = _attr(el, "aria-label") or ""
+        m = _MS_STAR_EN_RE.search(aria)
         if m:
             return float(m.group(1))
 
@@ -76,125 +192,143 @@ def extract_morningstar_stars(soup: BeautifulSoup) -> Optional[float]:
 
 
 def _table_to_matrix(table) -> Tuple[list[str], list[list[str]]]:
-    headers: list[str] = []
-    thead = table.find("thead")
-    if thead:
-        headers = [_clean_text(th.get_text(" ", strip=True)) for th in thead.find_all(["th", "td"])]
+    # Cellules brutes (_text suffit): _clean_text n'est appliqué qu'aux
+    # quelques chaînes réellement comparées ou retournées, pas à chaque cellule.
+    headers = [_text(c) for c in _css(table, "thead th, thead td")]
+
+    if _css_first(table, "tbody") is not None:
+        trs = _css(table, "tbody tr")
+    else:
+        trs = _css(table, "tr")
 
     rows: list[list[str]] = []
-    tbody = table.find("tbody") or table
-    for tr in tbody.find_all("tr"):
-        cells = [_clean_text(td.get_text(" ", strip=True)) for td in tr.find_all(["th", "td"])]
+    for tr in trs:
+        cells = [_text(td) for td in _css(tr, "th, td")]
         if any(cells):
             rows.append(cells)
 
     return headers, rows
 
 
-def _find_value_in_any_table(
-    soup: BeautifulSoup,
-    row_label_candidates: list[str],
-    col_label_candidates: list[str],
-) -> Optional[str]:
-    row_l = [r.lower() for r in row_label_candidates]
-    col_l = [c.lower() for c in col_label_candidates]
+def _extract_all_tables(
+    soup: HtmlTree,
+    header_markers: Optional[Tuple[str, ...]] = None,
+) -> list[Tuple[list[str], list[list[str]]]]:
+    """
+    Matérialise (headers, rows) pour chaque <table> de la page, une seule
+    fois : les recherches successives se font ensuite en pur Python sans
+    re-parcourir le DOM.
+
+    Si header_markers est fourni (libellés en minuscules), les tables dont
+    l'en-tête (thead ou première ligne) ne contient aucun marqueur sont
+    écartées sans construire leur matrice — la plupart des tables d'une
+    page (navigation, frais, etc.) tombent ici.
+    """
+    out: list[Tuple[list[str], list[list[str]]]] = []
+    for table in _css(soup, "table"):
+        if header_markers is not None:
+            sample = _css_first(table, "thead") or _css_first(table, "tr")
+            if sample is None:
+                continue
+            sample_txt = _clean_text(_text(sample)).lower()
+            if not any(m in sample_txt for m in header_markers):
+                continue
+        out.append(_table_to_matrix(table))
+    return out
+
+
+def extract_morningstar_performances(soup: HtmlTree) -> Dict[str, Optional[float]]:
+    """
+    Une seule passe sur les tables matérialisées: pour chaque table on
+    construit l'index des en-têtes et la ligne "Fonds" une fois, puis les
+    quatre horizons encore manquants sont résolus par lookups dict.
+    """
+    raw: Dict[str, Optional[str]] = {k: None for k in _MS_PERF_COLS}
+    remaining = set(_MS_PERF_COLS)
 
-    for table in soup.find_all("table"):
-        headers, rows = _table_to_matrix(table)
+    for headers, rows in _extract_all_tables(soup, header_markers=_MS_ALL_PERF_COLS):
+        if not remaining:
+            break
         if not headers or not rows:
             continue
 
-        headers_l = [h.lower() for h in headers]
+        # index {header: position} construit une fois par table -> lookups O(1)
+        # (setdefault: en cas de doublon on garde la 1re occurrence, comme .index)
+        hmap: Dict[str, int] = {}
+        for i, h in enumerate(headers):
+            hmap.setdefault(_clean_text(h).lower(), i)
 
-        col_idx = None
-        for c in col_l:
-            if c in headers_l:
-                col_idx = headers_l.index(c)
-                break
-        if col_idx is None:
+        fund_rows = [r for r in rows if r and _clean_text(r[0]).lower() in _MS_ROW_FUND]
+        if not fund_rows:
             continue
 
-        for r in rows:
-            if not r:
+        for key in list(remaining):
+            col_idx = next((hmap[c] for c in _MS_PERF_COLS[key] if c in hmap), None)
+            if col_idx is None:
                 continue
-            if r[0].lower() in row_l and col_idx < len(r):
-                return r[col_idx]
-
-    return None
-
-
-def extract_morningstar_performances(soup: BeautifulSoup) -> Dict[str, Optional[float]]:
-    row_fund = ["Fonds", "Fund"]
+            for r in fund_rows:
+                if col_idx < len(r):
+                    raw[key] = r[col_idx]
+                    remaining.discard(key)
+                    break
 
-    perf_4w = _find_value_in_any_table(
-        soup, row_fund, ["4 sem.", "4 sem", "4 weeks", "4w", "1 mois", "1 month", "1m"]
-    )
-    perf_ytd = _find_value_in_any_table(
-        soup, row_fund, ["YTD", "year to date", "depuis le début", "depuis le début de l'année"]
-    )
-    perf_1y = _find_value_in_any_table(soup, row_fund, ["1 an", "1 year", "1y"])
-    perf_3y = _find_value_in_any_table(soup, row_fund, ["3 ans", "3 years", "3 year", "3y"])
+    return {k: _parse_fr_number(v) for k, v in raw.items()}
 
-    return {
-        "perf_4_semaines": _parse_fr_number(perf_4w),
-        "perf_depuis_1er_janvier": _parse_fr_number(perf_ytd),
-        "perf_1_an": _parse_fr_number(perf_1y),
-        "perf_3_ans": _parse_fr_number(perf_3y),
-    }
 
-
-def parse_morningstar_html_file(html_path: Path) -> Dict[str, Any]:
-    soup = make_soup(read_html(html_path))
+def _parse_morningstar_soup(soup: HtmlTree, source_file: str) -> Dict[str, Any]:
     return {
         "site": "morningstar",
         "name": extract_morningstar_name(soup),
         "stars": extract_morningstar_stars(soup),
         **extract_morningstar_performances(soup),
-        "source_file": html_path.name,
+        "source_file": source_file,
     }
 
 
+def parse_morningstar_html_file(html_path: Path) -> Dict[str, Any]:
+    return _parse_morningstar_soup(make_soup(read_html(html_path)), html_path.name)
+
+
 # =========================
 # Quantalys
 # =========================
-def extract_quantalys_name(soup: BeautifulSoup) -> Optional[str]:
-    node = soup.select_one("h1 strong")
-    if node:
-        return _clean_text(node.get_text(" ", strip=True))
-    h1 = soup.find("h1")
-    return _clean_text(h1.get_text(" ", strip=True)) if h1 else None
+def extract_quantalys_name(soup: HtmlTree) -> Optional[str]:
+    h1 = _css_first(soup, "h1")
+    if h1 is None:
+        return None
+    node = _css_first(h1, "strong")
+    return _clean_text(_text(node if node is not None else h1))
 
 
-def extract_quantalys_stars(soup: BeautifulSoup) -> Optional[int]:
+def extract_quantalys_stars(soup: HtmlTree) -> Optional[int]:
     """
     Notation rendue via:
       <div class="spritefonds sprite-5g ...">
     ou via une image "qt-star-x-y.png"
     """
-    sprite = soup.select_one(".spritefonds")
+    sprite = _css_first(soup, ".spritefonds")
     if sprite:
-        classes = " ".join(sprite.get("class", []))
-        m = re.search(r"sprite-(\d)g", classes)
-        if m:
-            return int(m.group(1))
+        # test direct "sprite-Ng" sur chaque classe, sans regex
+        for cls in (_attr(sprite, "class") or "").split():
+            if cls.startswith("sprite-") and len(cls) >= 9 and cls[7].isdigit() and cls[8] == "g":
+                return int(cls[7])
 
-    img = soup.find("img", src=re.compile(r"qt-star-(\d)-(\d)\.png"))
-    if img and img.get("src"):
-        m = re.search(r"qt-star-(\d)-(\d)\.png", img["src"])
+    for img in _css(soup, "img[src]"):
+        m = _QT_STAR_IMG_RE.search(_attr(img, "src") or "")
         if m:
             return int(m.group(1))
 
     return None
 
 
-def extract_quantalys_performances(soup: BeautifulSoup) -> Dict[str, Optional[float]]:
+def extract_quantalys_performances(soup: HtmlTree) -> Dict[str, Optional[float]]:
     """
     Quantalys: performances dans un tableau de classe:
       table table-condensed-max table-hover
     On prend la colonne "Fonds" (détectée via l'en-tête).
     """
 
-    tables = soup.select("table.table.table-condensed-max.table-hover")
+    tables = _css(soup, "table.table.table-condensed-max.table-hover")
     if not tables:
         return {
             "perf_4_semaines": None,
@@ -204,7 +338,7 @@ def extract_quantalys_performances(soup: BeautifulSoup) -> Dict[str, Optional[fl
         }
 
     def table_has_perf_labels(t) -> bool:
-        txt = _clean_text(t.get_text(" ", strip=True)).lower()
+        txt = _clean_text(_text(t)).lower()
         return (
             "perf. 4 semaines" in txt
             or "perf. 1er janvier" in txt
@@ -217,64 +351,65 @@ def extract_quantalys_performances(soup: BeautifulSoup) -> Dict[str, Optional[fl
     # index colonne Fonds
     idx_fonds = 1
     header_cells = []
-    thead = perf_table.find("thead")
+    thead = _css_first(perf_table, "thead")
     if thead:
-        header_cells = thead.find_all(["th", "td"])
+        header_cells = _css(thead, "th, td")
     else:
-        first_tr = perf_table.find("tr")
+        first_tr = _css_first(perf_table, "tr")
         if first_tr:
-            header_cells = first_tr.find_all(["th", "td"])
+            header_cells = _css(first_tr, "th, td")
 
     if header_cells:
-        labels = [_clean_text(c.get_text(" ", strip=True)).lower() for c in header_cells]
+        labels = [_clean_text(_text(c)).lower() for c in header_cells]
         for i, lab in enumerate(labels):
             if lab == "fonds":
                 idx_fonds = i
                 break
 
-    patterns = {
-        "perf_4_semaines": re.compile(r"^perf\.\s*4\s*semaines$", re.I),
-        "perf_depuis_1er_janvier": re.compile(r"^perf\.\s*1er\s*janvier$", re.I),
-        "perf_1_an": re.compile(r"^perf\.\s*1\s*an$", re.I),
-        "perf_3_ans": re.compile(r"^perf\.\s*3\s*ans$", re.I),
-    }
-
-    out_raw: Dict[str, Optional[str]] = {k: None for k in patterns}
+    out_raw: Dict[str, Optional[str]] = {k: None for k in _QT_PERF_KEYS.values()}
 
-    for tr in perf_table.find_all("tr"):
-        cells = tr.find_all(["td", "th"])
+    for tr in _css(perf_table, "tr"):
+        cells = _css(tr, "th, td")
         if len(cells) <= idx_fonds:
             continue
 
-        label = _clean_text(cells[0].get_text(" ", strip=True))
-        value = _clean_text(cells[idx_fonds].get_text(" ", strip=True))
+        label = _clean_text(_text(cells[0]))
 
-        for key, rx in patterns.items():
-            if rx.match(label):
-                out_raw[key] = value
+        m = _QT_PERF_RE.match(label)
+        if m:
+            # valeur brute: _parse_fr_number renormalise de toute façon
+            out_raw[_QT_PERF_KEYS[m.lastgroup]] = _text(cells[idx_fonds])
 
     return {k: _parse_fr_number(v) for k, v in out_raw.items()}
 
 
-def parse_quantalys_html_file(html_path: Path) -> Dict[str, Any]:
-    soup = make_soup(read_html(html_path))
+def _parse_quantalys_soup(soup: HtmlTree, source_file: str) -> Dict[str, Any]:
     return {
         "site": "quantalys",
         "name": extract_quantalys_name(soup),
         "stars": extract_quantalys_stars(soup),
         **extract_quantalys_performances(soup),
-        "source_file": html_path.name,
+        "source_file": source_file,
     }
 
 
+def parse_quantalys_html_file(html_path: Path) -> Dict[str, Any]:
+    return _parse_quantalys_soup(make_soup(read_html(html_path)), html_path.name)
+
+
 # =========================
 # Détection + exécution
 # =========================
-def detect_site(html: str) -> Optional[str]:
-    h = html.lower()
-    if "quantalys" in h:
+def detect_site(html: bytes) -> Optional[str]:
+    # Scan borné au préfixe: évite un .lower() (copie complète) sur un
+    # document de plusieurs Mo. Repli sur le document entier si besoin.
+    if _QT_MARK_RE.search(html, 0, _DETECT_HEAD):
+        return "quantalys"
+    if _MS_MARK_RE.search(html, 0, _DETECT_HEAD):
+        return "morningstar"
+    if _QT_MARK_RE.search(html):
         return "quantalys"
-    if "morningstar" in h:
+    if _MS_MARK_RE.search(html):
         return "morningstar"
     return None
 
@@ -283,10 +418,11 @@ def parse_any_html_file(html_path: Path) -> Dict[str, Any]:
     html = read_html(html_path)
     site = detect_site(html)
 
+    # Une seule lecture + un seul parse: on dispatch sur l'arbre déjà construit.
     if site == "quantalys":
-        return parse_quantalys_html_file(html_path)
+        return _parse_quantalys_soup(make_soup(html), html_path.name)
     if site == "morningstar":
-        return parse_morningstar_html_file(html_path)
+        return _parse_morningstar_soup(make_soup(html), html_path.name)
 
     return {
         "site": None,
@@ -310,7 +446,8 @@ if __name__ == "__main__":
         print(f"Aucun fichier .html trouvé dans: {captures_dir}")
         raise SystemExit(1)
 
-    for p in html_files:
-        data = parse_any_html_file(p)
-        print(f"\n=== {p.name} ===")
-        print(json.dumps(data, ensure_ascii=False, indent=2))
+    # Chaque fichier est indépendant et CPU-bound: un process par coeur.
+    with ProcessPoolExecutor() as ex:
+        for p, data in zip(html_files, ex.map(parse_any_html_file, html_files)):
+            print(f"\n=== {p.name} ===")
+            print(json.dumps(data, ensure_ascii=False, indent=2))
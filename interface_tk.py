@@ -1,10 +1,12 @@
 from __future__ import annotations
 
-import re
+import functools
+import queue
 import threading
 import time
+from concurrent.futures import Future, ThreadPoolExecutor
 from dataclasses import dataclass, field
-from collections import deque
+from collections import OrderedDict, deque
 from datetime import datetime
 from pathlib import Path
 from typing import Deque, Dict, Optional, List
@@ -24,7 +26,19 @@ STATUS_PAUSED = "Pause (captcha/cookies)"
 STATUS_ERROR = "Erreur"
 
 
+class _SlugTable(dict):
+    # table pour str.translate: a-z0-9 inchangés, tout le reste (y compris
+    # les codepoints non prévus) -> "-", comme [^a-z0-9]+ avant collapse
+    def __missing__(self, codepoint: int) -> str:
+        return "-"
+
+
+_SLUG_TABLE = _SlugTable({ord(c): c for c in "abcdefghijklmnopqrstuvwxyz0123456789"})
+
+
+@functools.lru_cache(maxsize=4096)
 def detect_site(url: str) -> str:
+    # Mémoïsé: la même URL repasse ici à chaque re-capture / requeue
     u = url.lower()
     if "morningstar." in u:
         return "morningstar"
@@ -35,12 +49,24 @@ def detect_site(url: str) -> str:
 
 def slugify(s: str, max_len: int = 60) -> str:
     s = s.strip().lower()
-    s = re.sub(r"https?://", "", s)
-    s = re.sub(r"[^a-z0-9]+", "-", s)
-    s = re.sub(r"-+", "-", s).strip("-")
+    if s.startswith("https://"):
+        s = s[8:]
+    elif s.startswith("http://"):
+        s = s[7:]
+    # une passe translate C, puis collapse des tirets (borné: la chaîne
+    # raccourcit à chaque tour)
+    s = s.translate(_SLUG_TABLE)
+    while "--" in s:
+        s = s.replace("--", "-")
+    s = s.strip("-")
     return s[:max_len] if len(s) > max_len else s
 
 
+def normalize_url(url: str) -> str:
+    # Clé de déduplication des URLs enfilées
+    return url.lower().rstrip("/")
+
+
 @dataclass
 class Task:
     id: int
@@ -54,24 +80,39 @@ class Task:
         self.site = detect_site(self.url)
 
 
+# Nombre de sessions Firefox pré-chauffées (les tâches se répartissent dessus)
+DEFAULT_POOL_SIZE = 2
+
+
 class AcquisitionManager:
     """
     Logique (hors UI) :
       - queue des tâches
-      - worker Selenium (thread)
+      - pool de sessions Selenium + dispatch sur un ThreadPoolExecutor
+        (une URL qui rame ou un captcha ne bloque plus les autres)
       - pause / reprendre / recommencer
       - MAJ UI via callbacks
     """
 
-    def __init__(self, *, on_task_update, on_log, on_state) -> None:
+    def __init__(self, *, on_task_update, on_log, on_state, pool_size: int = DEFAULT_POOL_SIZE) -> None:
         self.on_task_update = on_task_update  # (task: Task) -> None
         self.on_log = on_log                  # (msg: str) -> None
         self.on_state = on_state              # (state_msg: str) -> None
 
-        self.session = BrowserSession()
+        self.pool_size = max(1, pool_size)
+        self._sessions: "queue.Queue[BrowserSession]" = queue.Queue()
+        self._all_sessions: List[BrowserSession] = []
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._inflight: "set[Future]" = set()
 
+        # Historique complet (lookups par id) + file FIFO des tâches en attente.
+        # OrderedDict: popitem(last=False) et move_to_end(..., last=False) sont
+        # O(1), là où deque.remove(tid) était O(n).
         self.tasks_by_id: Dict[int, Task] = {}
-        self.queue: Deque[int] = deque()
+        self._pending: "OrderedDict[int, Task]" = OrderedDict()
+        # URLs normalisées déjà enfilées: un doublon dans le textbox coûte
+        # un goto + capture + écriture disque complets, autant le sauter
+        self._seen_urls: set[str] = set()
         self._next_id = 1
 
         self._worker_thread: Optional[threading.Thread] = None
@@ -81,10 +122,27 @@ class AcquisitionManager:
         self._running = threading.Event()
         self._paused = threading.Event()
 
+        # réveils sans polling: _wake débloque le dispatcher sur un changement
+        # d'état, _interrupt court-circuite les attentes de stabilisation
+        self._wake = threading.Event()
+        self._interrupt = threading.Event()
+
         # Tâche en cours + dernier succès (pour "Recommencer")
         self._current_task_id: Optional[int] = None
         self._last_done_task_id: Optional[int] = None
 
+        # Avec un pool de N sessions, jusqu'à N tâches peuvent être en vol au
+        # moment d'un clic Pause: on note chacune d'elles, "Reprendre" doit
+        # toutes les remettre en tête (un seul _current_task_id ne suffit pas)
+        self._paused_task_ids: "set[int]" = set()
+
+        # Ids dont le _process_task tourne encore (posé au dispatch, retiré
+        # dans son finally) + ids dont la requeue de "Reprendre" attend que
+        # leur thread rende la main — requeue immédiate sinon la même Task
+        # partirait sur une 2e session pendant que la 1re est encore dans goto
+        self._inflight_task_ids: "set[int]" = set()
+        self._resume_pending_ids: "set[int]" = set()
+
         # important : Reprendre doit redémarrer la tâche en cours
         self._restart_current_requested = threading.Event()
 
@@ -98,11 +156,16 @@ class AcquisitionManager:
             url = raw.strip()
             if not url:
                 continue
+            norm = normalize_url(url)
+            if norm in self._seen_urls:
+                self.on_log(f"Doublon ignoré : {url}")
+                continue
+            self._seen_urls.add(norm)
             tid = self._next_id
             self._next_id += 1
             task = Task(id=tid, url=url)
             self.tasks_by_id[tid] = task
-            self.queue.append(tid)
+            self._pending[tid] = task
             ids.append(tid)
             self.on_task_update(task)
         return ids
@@ -114,45 +177,61 @@ class AcquisitionManager:
         if last is None:
             return None
 
+        # Contourne volontairement _seen_urls : "Recommencer" est un retry explicite
         tid = self._next_id
         self._next_id += 1
         task = Task(id=tid, url=last.url)
         self.tasks_by_id[tid] = task
-        self.queue.appendleft(tid)
+        self._pending[tid] = task
+        self._pending.move_to_end(tid, last=False)
         self.on_task_update(task)
         self.on_log(f"Recommencer: remis en haut de pile → {task.url}")
         return tid
 
     # ---------- Session ----------
     def open_browser_if_needed(self) -> None:
-        if self.session.is_open():
+        if len(self._all_sessions) >= self.pool_size:
             return
         script_dir = Path(__file__).resolve().parent
-        self.session.open(script_dir=script_dir)
-        self.on_state("Firefox ouvert (session unique conservée jusqu’à fermeture de l’UI).")
+        while len(self._all_sessions) < self.pool_size:
+            session = BrowserSession()
+            session.open(script_dir=script_dir)
+            self._all_sessions.append(session)
+            self._sessions.put(session)
+        self.on_state(
+            f"Firefox ouvert ({self.pool_size} session(s) conservée(s) jusqu’à fermeture de l’UI)."
+        )
 
     # ---------- Contrôles ----------
     def start(self) -> None:
         self.open_browser_if_needed()
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.pool_size, thread_name_prefix="acquisition"
+            )
         if self._worker_thread is None or not self._worker_thread.is_alive():
             self._stop.clear()
             self._worker_thread = threading.Thread(target=self._worker_loop, daemon=True)
             self._worker_thread.start()
 
         self._paused.clear()
+        self._interrupt.clear()
         self._running.set()
+        self._wake.set()
         self.on_state("Acquisition démarrée (auto).")
 
     def pause(self) -> None:
         # On met en pause : le navigateur reste ouvert.
         self._paused.set()
         self._running.clear()
+        self._interrupt.set()
+        self._wake.set()
 
-        # MAJ statut de la tâche en cours (si connue)
-        if self._current_task_id is not None:
-            t = self.tasks_by_id.get(self._current_task_id)
-            if t and t.status not in (STATUS_CAPTURED, STATUS_ERROR):
+        # MAJ statut de toutes les tâches en vol (jusqu'à pool_size)
+        for t in list(self.tasks_by_id.values()):
+            if t.status in (STATUS_NAV, STATUS_DONE):
                 t.status = STATUS_PAUSED
+                self._paused_task_ids.add(t.id)
                 self.on_task_update(t)
 
         self.on_state("PAUSE : résous captcha/cookies, puis clique Reprendre.")
@@ -165,155 +244,219 @@ class AcquisitionManager:
         """
         self._restart_current_requested.set()
         self._paused.clear()
+        self._interrupt.clear()
         self._running.set()
+        self._wake.set()
         self.on_state("Reprise : redémarrage de l’acquisition en cours…")
 
     def stop(self) -> None:
         self._stop.set()
         self._running.clear()
         self._paused.clear()
+        self._interrupt.set()
+        self._wake.set()
 
     def close_browser(self) -> None:
-        self.session.close()
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+        for session in self._all_sessions:
+            try:
+                session.close()
+            except OSError as e:
+                # Écritures de capture échouées, flushées au close du writer
+                self.on_log(str(e))
+                self.on_state("Erreur : des captures n'ont pas été écrites sur disque.")
+        self._all_sessions.clear()
+        while not self._sessions.empty():
+            try:
+                self._sessions.get_nowait()
+            except queue.Empty:
+                break
 
     # ---------- Worker ----------
     def _restart_current_if_needed(self) -> None:
         """
-        Si l'utilisateur a cliqué "Reprendre", on remet la tâche courante en tête
-        (sans créer de nouvelle tâche), en réinitialisant son état.
+        Si l'utilisateur a cliqué "Reprendre", on marque pour requeue toutes
+        les tâches mises en pause en vol (sans créer de nouvelles tâches).
+        La requeue effective se fait dans _requeue_resumed_tasks, qui attend
+        que le _process_task d'une tâche encore en vol rende la main.
         """
         if not self._restart_current_requested.is_set():
             return
 
         self._restart_current_requested.clear()
 
-        tid = self._current_task_id
-        if tid is None:
-            return
+        self._resume_pending_ids |= self._paused_task_ids
+        self._paused_task_ids.clear()
+        if self._current_task_id is not None:
+            self._resume_pending_ids.add(self._current_task_id)
+        self._current_task_id = None
 
-        task = self.tasks_by_id.get(tid)
-        if task is None:
+    def _requeue_resumed_tasks(self) -> None:
+        if not self._resume_pending_ids:
             return
 
-        # Si déjà capturée/erreur, pas besoin
-        if task.status in (STATUS_CAPTURED, STATUS_ERROR):
-            return
+        # Insertion en tête du plus récent au plus ancien: le plus ancien
+        # ressort en premier (ordre FIFO d'origine conservé)
+        for tid in sorted(self._resume_pending_ids, reverse=True):
+            # Son thread tourne encore (ex: bloqué dans goto au moment du
+            # clic): requeue différée au prochain tour, sinon la même Task
+            # partirait en double sur une autre session
+            if tid in self._inflight_task_ids:
+                continue
 
-        # Réinitialise et remet en tête
-        task.status = STATUS_QUEUED
-        task.saved_path = ""
-        task.error = ""
-        self.on_task_update(task)
+            self._resume_pending_ids.discard(tid)
 
-        # Important : si jamais elle était déjà dans la queue, éviter doublon
-        try:
-            self.queue.remove(tid)
-        except ValueError:
-            pass
+            task = self.tasks_by_id.get(tid)
+            if task is None:
+                continue
 
-        self.queue.appendleft(tid)
-        self.on_log(f"Reprendre → tâche en cours remise en tête : {task.url}")
+            # Si déjà capturée/erreur, pas besoin
+            if task.status in (STATUS_CAPTURED, STATUS_ERROR):
+                continue
 
-        # On "libère" la courante : la prochaine itération la reprendra proprement
-        self._current_task_id = None
+            # Réinitialise et remet en tête
+            task.status = STATUS_QUEUED
+            task.saved_path = ""
+            task.error = ""
+            self.on_task_update(task)
+
+            # Important : si jamais elle était déjà en attente, éviter doublon
+            self._pending.pop(tid, None)
+            self._pending[tid] = task
+            self._pending.move_to_end(tid, last=False)
+            self.on_log(f"Reprendre → tâche remise en tête : {task.url}")
 
     def _worker_loop(self) -> None:
         self.on_log("Worker Selenium démarré.")
 
         while not self._stop.is_set():
-            # Attendre un start
+            # Attendre un start (réveil immédiat via l'Event, timeout
+            # uniquement pour re-vérifier _stop)
             if not self._running.is_set():
-                time.sleep(0.1)
+                self._running.wait(timeout=0.5)
                 continue
 
             # Si pause : attendre (et permettre reprise)
             if self._paused.is_set():
                 # Au retour de pause, on doit redémarrer l'acquisition en cours
                 self._restart_current_if_needed()
-                time.sleep(0.1)
+                self._requeue_resumed_tasks()
+                self._wake.wait(timeout=0.5)
+                self._wake.clear()
                 continue
 
-            # Si reprise demandée : on prépare la requeue immédiate
+            # Si reprise demandée : requeue (différée tant qu'un thread
+            # travaille encore sur la tâche)
             self._restart_current_if_needed()
+            self._requeue_resumed_tasks()
 
             # Rien à faire ?
-            if not self.queue:
-                self.on_state("Queue vide. (Firefox reste ouvert)")
-                self._running.clear()
-                time.sleep(0.1)
+            if not self._pending:
+                if not self._inflight:
+                    self.on_state("Queue vide. (Firefox reste ouvert)")
+                    self._running.clear()
+                    continue
+                self._wake.wait(timeout=0.5)
+                self._wake.clear()
                 continue
 
-            tid = self.queue.popleft()
-            task = self.tasks_by_id.get(tid)
-            if task is None:
+            # Une session libre ? (sinon on retentera au prochain tour)
+            try:
+                session = self._sessions.get(timeout=0.1)
+            except queue.Empty:
+                continue
+
+            try:
+                tid, task = self._pending.popitem(last=False)
+            except KeyError:
+                self._sessions.put(session)
                 continue
 
             self._current_task_id = tid
+            self._inflight_task_ids.add(tid)
 
-            # ----- NAVIGATION -----
-            task.status = STATUS_NAV
-            task.error = ""
-            self.on_task_update(task)
+            future = self._executor.submit(self._process_task, task, session)
+            self._inflight.add(future)
+            future.add_done_callback(self._inflight.discard)
 
-            try:
-                self.on_log(f"GET → {task.url}")
-                self.session.goto(task.url)
+        self.on_log("Worker Selenium arrêté.")
 
-                # Si pause a été cliquée pendant le chargement (elle sera vue ici)
-                if self._paused.is_set():
-                    task.status = STATUS_PAUSED
-                    self.on_task_update(task)
-                    continue
+    def _process_task(self, task: Task, session: BrowserSession) -> None:
+        tid = task.id
 
-                task.status = STATUS_DONE
-                self.on_task_update(task)
-                self.on_state(f"Recherche effectuée : {task.site}")
-
-                # ----- ATTENTE éventuelle post-load (stabilisation DOM) -----
-                t0 = time.time()
-                while (time.time() - t0) < self.auto_capture_delay_s:
-                    if self._stop.is_set() or self._paused.is_set():
-                        break
-                    time.sleep(0.05)
-
-                if self._stop.is_set():
-                    break
-
-                # Si pause pendant la stabilisation : on attend, puis "Reprendre" relancera la tâche
-                if self._paused.is_set():
-                    task.status = STATUS_PAUSED
-                    self.on_task_update(task)
-                    continue
+        # ----- NAVIGATION -----
+        task.status = STATUS_NAV
+        task.error = ""
+        self.on_task_update(task)
 
-                # ----- CAPTURE -----
-                ts = datetime.now().strftime("%Y%m%d_%H%M%S")
-                base = f"{tid:04d}_{task.site}_{ts}_{slugify(task.url)}"
-                out_dir = Path("captures")
-                time.sleep(1.0)  # petite attente avant capture
-                result = self.session.capture_page_source(out_dir=out_dir, base_name=base)
+        try:
+            self.on_log(f"GET → {task.url}")
+            session.goto(task.url)
 
-                task.status = STATUS_CAPTURED
-                task.saved_path = str(result.html_path)
+            # Si pause a été cliquée pendant le chargement (elle sera vue ici)
+            if self._paused.is_set():
+                task.status = STATUS_PAUSED
+                self._paused_task_ids.add(tid)
                 self.on_task_update(task)
-                self.on_state(f"Page récupérée → {result.html_path}")
-                self._last_done_task_id = tid
+                return
 
-                # IMPORTANT: on enchaîne automatiquement → prochaine URL
+            task.status = STATUS_DONE
+            self.on_task_update(task)
+            self.on_state(f"Recherche effectuée : {task.site}")
+
+            # ----- ATTENTE éventuelle post-load (stabilisation DOM) -----
+            # sommeil bloquant, interrompu immédiatement par pause/stop
+            self._interrupt.wait(timeout=self.auto_capture_delay_s)
 
-            except Exception as e:
-                task.status = STATUS_ERROR
-                task.error = f"{type(e).__name__}: {e}"
+            if self._stop.is_set():
+                return
+
+            # Si pause pendant la stabilisation : on attend, puis "Reprendre" relancera la tâche
+            if self._paused.is_set():
+                task.status = STATUS_PAUSED
+                self._paused_task_ids.add(tid)
                 self.on_task_update(task)
-                self.on_state("Erreur sur une tâche (voir colonne Erreur).")
-                self.on_log(task.error)
+                return
 
-            finally:
-                # On conserve current_task_id tant que la tâche n’est pas terminée,
-                # car "Reprendre" doit relancer celle-ci si elle est en pause.
-                if task.status in (STATUS_CAPTURED, STATUS_ERROR):
-                    self._current_task_id = None
+            # ----- CAPTURE -----
+            ts = datetime.now().strftime("%Y%m%d_%H%M%S")
+            base = f"{tid:04d}_{task.site}_{ts}_{slugify(task.url)}"
+            out_dir = Path("captures")
+            time.sleep(1.0)  # petite attente avant capture
+            result = session.capture_page_source(out_dir=out_dir, base_name=base)
 
-        self.on_log("Worker Selenium arrêté.")
+            task.status = STATUS_CAPTURED
+            task.saved_path = str(result.html_path)
+            self.on_task_update(task)
+            self.on_state(f"Page récupérée → {result.html_path}")
+            self._last_done_task_id = tid
+
+            # IMPORTANT: on enchaîne automatiquement → prochaine URL
+
+        except Exception as e:
+            task.status = STATUS_ERROR
+            task.error = f"{type(e).__name__}: {e}"
+            self.on_task_update(task)
+            self.on_state("Erreur sur une tâche (voir colonne Erreur).")
+            self.on_log(task.error)
+            # L'URL redevient enfilable: re-coller l'URL dans le textbox est
+            # le chemin de récupération d'une tâche en erreur
+            self._seen_urls.discard(normalize_url(task.url))
+
+        finally:
+            # La session retourne dans le pool quoi qu'il arrive
+            self._sessions.put(session)
+            # On conserve current_task_id et _paused_task_ids tant que la tâche
+            # n’est pas terminée, car "Reprendre" doit relancer les tâches en pause.
+            if task.status in (STATUS_CAPTURED, STATUS_ERROR):
+                self._paused_task_ids.discard(tid)
+                if self._current_task_id == tid:
+                    self._current_task_id = None
+            # En dernier: une fois l'id retiré, le dispatcher peut requeuer
+            # la tâche sans risque de double exécution
+            self._inflight_task_ids.discard(tid)
 
 
 # ======== UI Tkinter ========
@@ -325,6 +468,18 @@ class StockSentinelUI:
 
         self.state_var = tk.StringVar(value="Prêt.")
 
+        # Coalescence des MAJ UI: les workers poussent dans une file, un seul
+        # callback Tk draine le tout toutes les ~30 ms (les états successifs
+        # d'une même tâche sont fusionnés, seul le dernier est rendu).
+        self._ui_queue: "queue.SimpleQueue" = queue.SimpleQueue()
+        self._ui_sched_lock = threading.Lock()
+        self._ui_scheduled = False
+        self._ui_drain_ms = 30
+
+        # Journal borné: le widget Text est réécrit d'un bloc à chaque drain,
+        # au lieu de grossir sans limite insertion par insertion.
+        self._log_ring: Deque[str] = deque(maxlen=500)
+
         self.manager = AcquisitionManager(
             on_task_update=self._ui_task_update_safe,
             on_log=self._ui_log_safe,
@@ -417,27 +572,72 @@ class StockSentinelUI:
         self.txt_urls.delete("1.0", "end")
         self.txt_urls.insert("1.0", s)
 
-    # ---- Thread-safe wrappers ----
+    # ---- Thread-safe wrappers (coalescés) ----
+    def _ui_push(self, item) -> None:
+        self._ui_queue.put(item)
+        with self._ui_sched_lock:
+            if not self._ui_scheduled:
+                self._ui_scheduled = True
+                self.root.after(self._ui_drain_ms, self._drain_ui)
+
     def _ui_task_update_safe(self, task: Task) -> None:
-        self.root.after(0, lambda: self._ui_task_update(task))
+        # snapshot immédiat: la tâche peut encore être mutée par le worker
+        values = (task.id, task.site, task.status, task.saved_path, task.error, task.url)
+        self._ui_push(("task", values))
 
     def _ui_log_safe(self, msg: str) -> None:
-        self.root.after(0, lambda: self._ui_log(msg))
+        self._ui_push(("log", msg))
 
     def _ui_state_safe(self, msg: str) -> None:
-        self.root.after(0, lambda: self.state_var.set(msg))
+        self._ui_push(("state", msg))
 
     # ---- UI update ----
-    def _ui_task_update(self, task: Task) -> None:
-        iid = str(task.id)
-        values = (task.id, task.site, task.status, task.saved_path, task.error, task.url)
+    def _drain_ui(self) -> None:
+        tasks: Dict[int, tuple] = {}
+        logs: List[str] = []
+        state: Optional[str] = None
+
+        while True:
+            try:
+                kind, payload = self._ui_queue.get_nowait()
+            except queue.Empty:
+                break
+            if kind == "task":
+                tasks[payload[0]] = payload  # le dernier état d'une tâche gagne
+            elif kind == "log":
+                logs.append(payload)
+            else:
+                state = payload
+
+        for values in tasks.values():
+            self._ui_task_update(values)
+        if logs:
+            self._log_ring.extend(logs)
+            self._refresh_log_widget()
+        if state is not None:
+            self.state_var.set(state)
+
+        with self._ui_sched_lock:
+            # des items ont pu arriver pendant le drain: on replanifie
+            if self._ui_queue.empty():
+                self._ui_scheduled = False
+            else:
+                self.root.after(self._ui_drain_ms, self._drain_ui)
+
+    def _ui_task_update(self, values: tuple) -> None:
+        iid = str(values[0])
         if self.tree.exists(iid):
             self.tree.item(iid, values=values)
         else:
             self.tree.insert("", "end", iid=iid, values=values)
 
     def _ui_log(self, msg: str) -> None:
-        self.txt_log.insert("end", msg + "\n")
+        self._log_ring.append(msg)
+        self._refresh_log_widget()
+
+    def _refresh_log_widget(self) -> None:
+        self.txt_log.delete("1.0", "end")
+        self.txt_log.insert("1.0", "\n".join(self._log_ring))
         self.txt_log.see("end")
 
     # ---- Buttons ----
@@ -1,7 +1,16 @@
+import concurrent.futures
+import mmap
+import os
 import re
-from bs4 import BeautifulSoup
 from pathlib import Path
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List
+
+import lxml.etree
+import lxml.html
+from lxml.html import HtmlElement
+
+
+_RE_STAR = re.compile(r"rating of\s+(\d+(?:\.\d+)?)\s+out of\s+5\s+stars", re.I)
 
 
 def _clean_text(s: str) -> str:
@@ -12,139 +21,287 @@ def _clean_text(s: str) -> str:
     )
 
 
+# Une passe translate en C au lieu de la chaîne de replace():
+# virgule -> point, '%' et tous les blancs Unicode supprimés (les pages
+# FR mélangent espaces fines U+2009/U+202F, insécables et espaces simples)
+_NUM_SPACES = (
+    " \t\n\r\x0b\x0c\xa0\u1680"
+    "\u2000\u2001\u2002\u2003\u2004\u2005\u2006\u2007\u2008\u2009\u200a"
+    "\u2028\u2029\u202f\u205f\u3000"
+)
+_NUM_TABLE = str.maketrans({",": ".", "%": None, **{c: None for c in _NUM_SPACES}})
+
+
 def _parse_fr_number(s: str) -> Optional[float]:
     """
     Convertit '2,75', '2,75 %', '—' -> float ou None.
     """
-    s = _clean_text(s).replace("%", "").strip()
+    s = s.strip()
     if s in {"—", "-", ""}:
         return None
-    s = s.replace(" ", "").replace(",", ".")
     try:
-        return float(s)
+        return float(s.translate(_NUM_TABLE))
     except ValueError:
         return None
 
 
-def extract_star_rating(soup: BeautifulSoup) -> Optional[float]:
+def _el_text(el: HtmlElement) -> str:
+    # itertext() concatène en C (et marche aussi sur les éléments du
+    # pull-parser); séparateur entre nœuds texte comme get_text(" ",
+    # strip=True) — "<th>3<br/>ans</th>" doit donner "3 ans", pas "3ans" —
+    # puis collapse des blancs
+    return _clean_text(" ".join(" ".join(el.itertext()).split()))
+
+
+def extract_star_rating(root: HtmlElement) -> Optional[float]:
     """
     Cherche aria-label du type: "rating of 5 out of 5 stars"
     """
-    el = soup.find(attrs={"aria-label": re.compile(r"rating of\s+\d+(\.\d+)?\s+out of\s+5\s+stars", re.I)})
-    if not el:
-        return None
-
-    aria = el.get("aria-label", "")
-    m = re.search(r"rating of\s+(\d+(?:\.\d+)?)\s+out of\s+5\s+stars", aria, flags=re.I)
-    return float(m.group(1)) if m else None
+    # Pré-filtre substring exécuté en C, la regex ne tourne que sur les
+    # rares survivants
+    for aria in root.xpath('//*[contains(@aria-label, "out of 5 stars")]/@aria-label'):
+        m = _RE_STAR.search(aria)
+        if m:
+            return float(m.group(1))
+    return None
 
 
-def _table_to_matrix(table) -> tuple[list[str], list[list[str]]]:
-    headers = [_clean_text(th.get_text(" ", strip=True)) for th in table.select("thead th")]
+def _table_to_matrix(table: HtmlElement) -> tuple[list[str], list[list[str]]]:
+    headers = [_el_text(th) for th in table.xpath(".//thead//th")]
     rows = []
-    for tr in table.select("tbody tr"):
-        cells = [_clean_text(td.get_text(" ", strip=True)) for td in tr.find_all(["th", "td"])]
+    for tr in table.xpath(".//tbody//tr"):
+        cells = [_el_text(td) for td in tr.xpath(".//th | .//td")]
         if cells:
             rows.append(cells)
     return headers, rows
 
 
+TableIndex = tuple[dict[str, int], dict[str, list[str]]]
+
+
+def _index_all_tables(root: HtmlElement) -> list[TableIndex]:
+    """
+    Indexe chaque table une seule fois:
+    - {header_minuscule: position de colonne}
+    - {libellé de 1ère cellule minuscule: ligne complète}
+    Les recherches suivantes se réduisent à des lookups dict.
+    """
+    indexed: list[TableIndex] = []
+    for table in root.iter("table"):
+        headers, rows = _table_to_matrix(table)
+        if not headers or not rows:
+            continue
+
+        hmap: dict[str, int] = {}
+        for i, h in enumerate(headers):
+            hmap.setdefault(h.lower(), i)
+
+        rmap: dict[str, list[str]] = {}
+        for r in rows:
+            if r:
+                rmap.setdefault(r[0].lower(), r)
+
+        indexed.append((hmap, rmap))
+    return indexed
+
+
+# Spécialisation runtime par lot: la mise en page d'un site ne change pas
+# d'une capture à l'autre, donc on mémorise pour chaque champ le couple
+# (header, libellé de ligne) qui a réellement matché. Les parses suivants
+# se réduisent à deux lookups dict par champ, avec repli sur le balayage
+# générique des synonymes si le site a été ré-habillé.
+_LABEL_HITS: Dict[str, tuple[str, str]] = {}
+
+
 def _find_value_in_any_table(
-    soup: BeautifulSoup,
+    indexed: list[TableIndex],
     row_label_candidates: list[str],
     col_label_candidates: list[str],
+    cache_key: Optional[str] = None,
 ) -> Optional[str]:
     """
-    Parcourt toutes les tables et tente de trouver:
+    Cherche dans les tables indexées:
     - une ligne dont la 1ère cellule == (Fonds / Fund / etc.)
     - une colonne dont le header == (YTD / 1 an / 3 ans / etc.)
-    Retourne la valeur brute (string) si trouvée.
+    Retourne la valeur brute (string) si trouvée. Avec cache_key, le couple
+    de libellés gagnant est réessayé en premier au parse suivant.
     """
+    if cache_key is not None:
+        hit = _LABEL_HITS.get(cache_key)
+        if hit is not None:
+            col_lab, row_lab = hit
+            for hmap, rmap in indexed:
+                col_idx = hmap.get(col_lab)
+                if col_idx is None:
+                    continue
+                r = rmap.get(row_lab)
+                if r is not None and col_idx < len(r):
+                    return r[col_idx]
+
     row_label_candidates_l = [r.lower() for r in row_label_candidates]
     col_label_candidates_l = [c.lower() for c in col_label_candidates]
 
-    for table in soup.find_all("table"):
-        headers, rows = _table_to_matrix(table)
-        if not headers or not rows:
-            continue
-
-        headers_l = [h.lower() for h in headers]
-
-        # cherche une colonne compatible
-        col_idx = None
+    for hmap, rmap in indexed:
         for c in col_label_candidates_l:
-            if c in headers_l:
-                col_idx = headers_l.index(c)
-                break
-        if col_idx is None:
-            continue
-
-        # cherche la ligne (Fonds / Fund)
-        for r in rows:
-            if not r:
+            col_idx = hmap.get(c)
+            if col_idx is None:
                 continue
-            if r[0].lower() in row_label_candidates_l:
-                if col_idx < len(r):
+            for rl in row_label_candidates_l:
+                r = rmap.get(rl)
+                if r is not None and col_idx < len(r):
+                    if cache_key is not None:
+                        _LABEL_HITS[cache_key] = (c, rl)
                     return r[col_idx]
+            break  # colonne trouvée mais pas la ligne: table suivante
     return None
 
 
-def extract_performances(soup: BeautifulSoup) -> Dict[str, Optional[float]]:
+# Synonymes possibles selon locale Morningstar (partagés entre le mode
+# streaming et extract_performances)
+_ROW_FUND = ["Fonds", "Fund"]
+_PERF_COL_CANDIDATES: Dict[str, list[str]] = {
+    "perf_4_semaines": ["4 sem.", "4 sem", "4 weeks", "4w", "1 mois", "1 month", "1m"],
+    "perf_depuis_1er_janvier": ["YTD", "year to date", "depuis le début", "depuis le début de l'année"],
+    "perf_1_an": ["1 an", "1 year", "1y"],
+    "perf_3_ans": ["3 ans", "3 years", "3 year", "3y"],
+}
+
+_CHUNK_SIZE = 64 * 1024
+
+
+def extract_performances(root: HtmlElement) -> Dict[str, Optional[float]]:
     """
     Cherche:
     - perf_4_semaines
     - perf_ytd (depuis 1er janvier)
     - perf_1_an
     - perf_3_ans
+
+    Une seule passe sur les tables indexées: pour chaque table, les
+    horizons encore manquants sont résolus ensemble, avec arrêt anticipé
+    dès que les quatre sont trouvés.
     """
-    # Synonymes possibles selon locale Morningstar
-    row_fund = ["Fonds", "Fund"]
+    row_l = [r.lower() for r in _ROW_FUND]
+    cols_l = {k: [c.lower() for c in cands] for k, cands in _PERF_COL_CANDIDATES.items()}
 
-    perf_4w = _find_value_in_any_table(
-        soup,
-        row_label_candidates=row_fund,
-        col_label_candidates=["4 sem.", "4 sem", "4 weeks", "4w", "1 mois", "1 month", "1m"],
-    )
+    raw: Dict[str, Optional[str]] = {k: None for k in _PERF_COL_CANDIDATES}
+    remaining = set(raw)
 
-    perf_ytd = _find_value_in_any_table(
-        soup,
-        row_label_candidates=row_fund,
-        col_label_candidates=["YTD", "year to date", "depuis le début", "depuis le début de l'année"],
-    )
+    for hmap, rmap in _index_all_tables(root):
+        for key in list(remaining):
+            # Couple de libellés gagnant du parse précédent d'abord
+            hit = _LABEL_HITS.get(key)
+            if hit is not None:
+                col_idx = hmap.get(hit[0])
+                if col_idx is not None:
+                    r = rmap.get(hit[1])
+                    if r is not None and col_idx < len(r):
+                        raw[key] = r[col_idx]
+                        remaining.discard(key)
+                        continue
+            for c in cols_l[key]:
+                col_idx = hmap.get(c)
+                if col_idx is None:
+                    continue
+                for rl in row_l:
+                    r = rmap.get(rl)
+                    if r is not None and col_idx < len(r):
+                        raw[key] = r[col_idx]
+                        remaining.discard(key)
+                        _LABEL_HITS[key] = (c, rl)
+                        break
+                break
+        if not remaining:
+            break
 
-    perf_1y = _find_value_in_any_table(
-        soup,
-        row_label_candidates=row_fund,
-        col_label_candidates=["1 an", "1 year", "1y"],
-    )
+    return {k: _parse_fr_number(v) if v is not None else None for k, v in raw.items()}
 
-    perf_3y = _find_value_in_any_table(
-        soup,
-        row_label_candidates=row_fund,
-        col_label_candidates=["3 ans", "3 years", "3 year", "3y"],
-    )
 
-    return {
-        "perf_4_semaines": _parse_fr_number(perf_4w) if perf_4w is not None else None,
-        "perf_depuis_1er_janvier": _parse_fr_number(perf_ytd) if perf_ytd is not None else None,
-        "perf_1_an": _parse_fr_number(perf_1y) if perf_1y is not None else None,
-        "perf_3_ans": _parse_fr_number(perf_3y) if perf_3y is not None else None,
-    }
+def parse_morningstar_html_file(html_path: str) -> Dict[str, Any]:
+    """
+    Parse incrémental (HTMLPullParser) sur un mmap du fichier: le cache de
+    pages de l'OS est la seule copie durable, on traite chaque <table> à son
+    événement "end" puis on libère le sous-arbre — la page entière n'est
+    jamais résidente en mémoire, et on s'arrête dès que la note et les
+    4 perfs sont trouvées (les pages de queue ne sont alors jamais lues).
+    """
+    stars: Optional[float] = None
+    raw: Dict[str, Optional[str]] = {k: None for k in _PERF_COL_CANDIDATES}
 
+    parser = lxml.etree.HTMLPullParser(events=("end",), tag=("table", "span", "div"))
 
-def parse_morningstar_html_file(html_path: str) -> Dict[str, Any]:
-    html = Path(html_path).read_text(encoding="utf-8", errors="ignore")
-    soup = BeautifulSoup(html, "lxml")
+    def done() -> bool:
+        return stars is not None and all(v is not None for v in raw.values())
+
+    def handle_event(elem) -> None:
+        nonlocal stars
+        if stars is None:
+            aria = elem.get("aria-label")
+            if aria:
+                m = _RE_STAR.search(aria)
+                if m:
+                    stars = float(m.group(1))
+
+        if elem.tag != "table":
+            return
+
+        # Les tables imbriquées seront re-balayées avec leur parente
+        indexed = _index_all_tables(elem)
+        for key, cols in _PERF_COL_CANDIDATES.items():
+            if raw[key] is None:
+                raw[key] = _find_value_in_any_table(indexed, _ROW_FUND, cols, cache_key=key)
+
+        # Idiome fast-iter: libère la table traitée et tout ce qui précède
+        parent = elem.getparent()
+        if parent is not None and not any(True for _ in elem.iterancestors("table")):
+            elem.clear()
+            while elem.getprevious() is not None:
+                del parent[0]
 
-    stars = extract_star_rating(soup)
-    perfs = extract_performances(soup)
+    with open(html_path, "rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        if size == 0:
+            # Capture vide (échec/interruption): mmap refuserait, et il n'y
+            # a de toute façon rien à extraire
+            return {"stars": None, **raw}
+
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            offset = 0
+            while not done() and offset < size:
+                # le slice mmap est un tampon transitoire de 64 Ko, pas un read()
+                chunk = mm[offset:offset + _CHUNK_SIZE]
+                offset += len(chunk)
+                parser.feed(chunk)
+
+                for _, elem in parser.read_events():
+                    handle_event(elem)
+
+    if not done():
+        # Document tronqué / balises non refermées: close() force les
+        # événements "end" en attente, sinon la dernière table est perdue
+        try:
+            parser.close()
+        except lxml.etree.XMLSyntaxError:
+            pass
+        for _, elem in parser.read_events():
+            handle_event(elem)
 
     return {
         "stars": stars,
-        **perfs,
+        **{k: _parse_fr_number(v) if v is not None else None for k, v in raw.items()},
     }
 
 
+def parse_many(paths: List[str]) -> List[Dict[str, Any]]:
+    """
+    Parse un lot de captures en parallèle (un processus par cœur): le
+    parsing lxml est pur CPU et indépendant par fichier, le GIL ne limite
+    donc pas. Résultats dans l'ordre des chemins fournis.
+    """
+    with concurrent.futures.ProcessPoolExecutor() as ex:
+        return list(ex.map(parse_morningstar_html_file, paths, chunksize=8))
+
+
 if __name__ == "__main__":
     script_dir = Path(__file__).resolve().parent
     html_path = script_dir / "captures" / "morningstar_capture.html"
@@ -1,8 +1,10 @@
 from __future__ import annotations
 
+import queue
+import threading
 from dataclasses import dataclass
 from pathlib import Path
-from typing import Optional
+from typing import List, Optional, Tuple
 
 from selenium import webdriver
 from selenium.webdriver.firefox.options import Options
@@ -47,6 +49,34 @@ class BrowserSession:
 
     def __init__(self) -> None:
         self.driver: Optional[webdriver.Firefox] = None
+        # Écritures disque déportées: la capture enfile (chemin, octets) et
+        # rend la main tout de suite, le writeback se recouvre avec le
+        # goto() suivant
+        self._write_queue: "queue.Queue[Optional[Tuple[Path, bytes]]]" = queue.Queue()
+        self._writer: Optional[threading.Thread] = None
+        # Échecs d'écriture mémorisés par le writer: la capture a déjà été
+        # annoncée réussie au moment du flush, close() remonte donc l'échec
+        self._write_errors: List[str] = []
+
+    def _writer_loop(self) -> None:
+        while True:
+            item = self._write_queue.get()
+            if item is None:
+                break
+            path, data = item
+            try:
+                path.write_bytes(data)
+            except OSError as e:
+                # Une écriture ratée ne doit pas tuer le thread (les
+                # captures suivantes restent à flusher), mais ne doit pas
+                # non plus être avalée: close() la remontera
+                self._write_errors.append(f"{path}: {type(e).__name__}: {e}")
+
+    def _enqueue_write(self, path: Path, data: bytes) -> None:
+        if self._writer is None:
+            self._writer = threading.Thread(target=self._writer_loop, daemon=True)
+            self._writer.start()
+        self._write_queue.put((path, data))
 
     def is_open(self) -> bool:
         return self.driver is not None
@@ -71,6 +101,14 @@ class BrowserSession:
         driver = webdriver.Firefox(service=service, options=options)
         driver.set_page_load_timeout(page_load_timeout)
 
+        # Réutilisation du socket TCP vers geckodriver pour chaque commande
+        # (goto / current_url / page_source). Selenium >= 4 l'active déjà via
+        # son PoolManager urllib3; on force le réglage sur les clients plus
+        # anciens où keep_alive est un attribut de l'executor.
+        executor = driver.command_executor
+        if hasattr(executor, "keep_alive"):
+            executor.keep_alive = True
+
         self.driver = driver
 
     def goto(self, url: str) -> None:
@@ -85,13 +123,20 @@ class BrowserSession:
         out_dir.mkdir(parents=True, exist_ok=True)
 
         current_url = self.driver.current_url
-        html = self.driver.page_source
+        # outerHTML récupéré en un execute_script: sensiblement plus léger que
+        # page_source (sérialisation WebDriver complète) sur les pages de
+        # plusieurs Mo. page_source reste le repli si le script ne rend rien.
+        html = self.driver.execute_script("return document.documentElement.outerHTML")
+        if not html:
+            html = self.driver.page_source
 
         html_path = out_dir / f"{base_name}.html"
         url_path = out_dir / f"{base_name}.url.txt"
 
-        html_path.write_text(html, encoding="utf-8")
-        url_path.write_text(current_url, encoding="utf-8")
+        # encode une fois + write_bytes: évite la couche text-io qui
+        # ré-encode le HTML (plusieurs Mo) au fil de l'eau
+        self._enqueue_write(html_path, html.encode("utf-8", errors="replace"))
+        self._enqueue_write(url_path, current_url.encode("utf-8", errors="replace"))
 
         return CaptureResult(current_url=current_url, html_path=html_path, url_path=url_path)
 
@@ -101,3 +146,13 @@ class BrowserSession:
                 self.driver.quit()
             finally:
                 self.driver = None
+        # Vide la file d'écritures avant de rendre la main: après close(),
+        # toutes les captures sont sur disque
+        if self._writer is not None:
+            self._write_queue.put(None)
+            self._writer.join()
+            self._writer = None
+        if self._write_errors:
+            errors = " ; ".join(self._write_errors)
+            self._write_errors = []
+            raise OSError(f"Écritures de capture échouées : {errors}")